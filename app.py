@@ -1,9 +1,14 @@
 import streamlit as st
 import matplotlib.pyplot as plt
-from samila import GenerativeImage, Projection, VALID_COLORS
+from samila import GenerativeImage, VALID_COLORS
+from samila.functions import float_range
+from samila.params import DEFAULT_START, DEFAULT_STEP, DEFAULT_STOP
 import random
 import numpy as np
 from math import sin, cos, tan, log, exp, sqrt
+from projections import PROJECTION_OPTIONS, project, frame_projection
+from sandbox import Expression, ExpressionError, render_timeout, run_with_budget
+from workers import generate_points
 
 # Page configuration
 st.set_page_config(
@@ -75,63 +80,58 @@ st.markdown("<h3 class='sub-header'>Create Beautiful NFT-Style Art with Python 
 def set_generate_pressed():
     st.session_state.generate_pressed = True
 
+# Number of points samila's generate() evaluates on its default grid
+GRID_POINTS = len(list(float_range(DEFAULT_START, DEFAULT_STOP, DEFAULT_STEP))) ** 2
+
 # Function to generate mathematical expressions
 def generate_functions():
-    function_options = {
+    # Expressions are passed to the render worker as text, so the predefined
+    # functions are written the same way as custom ones
+    operation_templates = {
+        '+': "{0}(x) + {0}(y)",
+        '-': "{0}(x) - {0}(y)",
+        '*': "{0}(x) * {0}(y)",
+        # Division with protection against division by zero
+        '/': "{0}(x) / ({0}(y) if {0}(y) != 0 else 0.001)"
+    }
+    
+    # Names available to expressions, which are evaluated without builtins
+    custom_names = {
+        'x': None,
+        'y': None,
         'sin': sin,
         'cos': cos,
         'tan': tan,
+        'log': log,
         'exp': exp,
         'sqrt': sqrt,
-        'custom': None
+        'abs': abs,
+        'pi': np.pi,
+        'e': np.e
     }
     
-    operations = ['+', '-', '*', '/']
-    
     function_type1 = st.session_state.function_type1
     function_type2 = st.session_state.function_type2
     
     if function_type1 == 'custom':
-        custom_function1 = st.session_state.custom_function1
         try:
-            def f1(x, y):
-                return eval(custom_function1)
-        except:
-            st.error("Invalid function 1. Using default.")
-            f1 = lambda x, y: sin(x)
+            f1 = Expression(st.session_state.custom_function1, custom_names)
+        except ExpressionError as error:
+            st.error(f"Invalid function 1: {error} Using default.")
+            f1 = Expression("sin(x)", custom_names)
     else:
-        func1 = function_options[function_type1]
-        operation1 = st.session_state.operation1
-        
-        if operation1 == '+':
-            f1 = lambda x, y: func1(x) + func1(y)
-        elif operation1 == '-':
-            f1 = lambda x, y: func1(x) - func1(y)
-        elif operation1 == '*':
-            f1 = lambda x, y: func1(x) * func1(y)
-        else:  # Division with protection against division by zero
-            f1 = lambda x, y: func1(x) / (func1(y) if func1(y) != 0 else 0.001)
+        template1 = operation_templates[st.session_state.operation1]
+        f1 = Expression(template1.format(function_type1), custom_names)
     
     if function_type2 == 'custom':
-        custom_function2 = st.session_state.custom_function2
         try:
-            def f2(x, y):
-                return eval(custom_function2)
-        except:
-            st.error("Invalid function 2. Using default.")
-            f2 = lambda x, y: cos(y)
+            f2 = Expression(st.session_state.custom_function2, custom_names)
+        except ExpressionError as error:
+            st.error(f"Invalid function 2: {error} Using default.")
+            f2 = Expression("cos(y)", custom_names)
     else:
-        func2 = function_options[function_type2]
-        operation2 = st.session_state.operation2
-        
-        if operation2 == '+':
-            f2 = lambda x, y: func2(x) + func2(y)
-        elif operation2 == '-':
-            f2 = lambda x, y: func2(x) - func2(y)
-        elif operation2 == '*':
-            f2 = lambda x, y: func2(x) * func2(y)
-        else:  # Division with protection against division by zero
-            f2 = lambda x, y: func2(x) / (func2(y) if func2(y) != 0 else 0.001)
+        template2 = operation_templates[st.session_state.operation2]
+        f2 = Expression(template2.format(function_type2), custom_names)
     
     return f1, f2
 
@@ -144,36 +144,37 @@ def create_art():
     f1, f2 = generate_functions()
     
     g = GenerativeImage(f1, f2)
-    g.generate(seed=seed)
-    
-    # Apply filters according to settings
-    if st.session_state.apply_random_sampling:
-        g.generate(st.session_state.random_sampling)
+    sampling = st.session_state.random_sampling if st.session_state.apply_random_sampling else None
+    # Generate the points in a worker with time and memory budgets; random
+    # sampling runs samila's generate() a second time
+    points = GRID_POINTS * (2 if sampling else 1)
+    g.data1, g.data2, g.seed = run_with_budget(generate_points, f1, f2, seed, sampling,
+                                               timeout=render_timeout(points))
     
     if st.session_state.apply_random_color:
         g.random_color()
-        g.plot()
-    else:
-        g.plot(color=color)
     
-    # Apply projections
+    # Apply projections to the generated points so the image is drawn on a
+    # plain Cartesian axis instead of matplotlib's slower projection axes.
+    # Samila plots data2 horizontally and data1 vertically.
     if projection != "None":
-        g.set_projection(getattr(Projection, projection.upper()))
+        data2, data1, kept = project(g.data2, g.data1, projection)
+        if not kept.any():
+            raise ValueError(f"No points fall inside the {projection} projection. "
+                             "Try different functions or another projection.")
+        g.data1, g.data2 = data1.tolist(), data2.tolist()
     
     # Apply other filters
+    plot_options = {
+        "color": color if not st.session_state.apply_random_color else None,
+        "size": (st.session_state.width, st.session_state.height)
+    }
     if st.session_state.apply_gradient:
-        fig = plt.figure(figsize=(st.session_state.width, st.session_state.height))
-        plt.axis('off')
-        g.plot(alpha=st.session_state.alpha, color=color if not st.session_state.apply_random_color else None)
-    else:
-        fig = plt.figure(figsize=(st.session_state.width, st.session_state.height))
-        plt.axis('off')
-        g.plot(color=color if not st.session_state.apply_random_color else None)
-    
-    fig = plt.figure(figsize=(st.session_state.width, st.session_state.height))
+        plot_options["alpha"] = st.session_state.alpha
+    g.plot(**plot_options)
     
-    plt.axis('off')
-    g.plot()
+    fig = g.fig
+    frame_projection(fig.axes[0], projection)
     
     return g, fig
 
@@ -251,7 +252,7 @@ with st.sidebar:
         )
     
     # Projection options
-    projection_options = ["None", "rectilinear", "polar", "aitoff", "hammer", "lambert", "mollweide"]
+    projection_options = PROJECTION_OPTIONS
     projection_index = projection_options.index(st.session_state.projection) if st.session_state.projection in projection_options else 0
     st.session_state.projection = st.selectbox(
         "Projection", 
@@ -330,6 +331,8 @@ with col1:
                     mime="image/png",
                     use_container_width=True
                 )
+        except ExpressionError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"An error occurred while generating the art. Please try different parameters.")
             st.error(f"Error details: {str(e)}")
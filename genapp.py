@@ -5,35 +5,33 @@ from matplotlib.colors import to_rgba
 import random
 import math
 import io 
+from projections import PROJECTION_OPTIONS, project, frame_projection
+from sandbox import Expression, ExpressionError, render_timeout, run_with_budget
+from workers import evaluate_points
 
 # Set page configuration
 st.set_page_config(layout="wide", page_title="Generative Art Creator")
 st.title("🎨 Generative Art Creator")
 
 # --- Helper function to safely evaluate expression ---
+safe_names = {
+    "x": None,
+    "y": None,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "exp": math.exp,
+    "log": math.log,
+    "sqrt": math.sqrt,
+    "pi": math.pi,
+    "e": math.e,
+    "abs": abs,
+    "random": random.random
+}
+
 def safe_function(expr):
-    def func(x, y=None):
-        try:
-            # Create a safe environment with limited functions
-            safe_env = {
-                "x": x,
-                "y": y,
-                "sin": math.sin,
-                "cos": math.cos,
-                "tan": math.tan,
-                "exp": math.exp,
-                "log": math.log,
-                "sqrt": math.sqrt,
-                "pi": math.pi,
-                "e": math.e,
-                "abs": abs,
-                "random": random.random
-            }
-            result = eval(expr, {"__builtins__": {}}, safe_env)
-            return result if isinstance(result, (int, float, complex)) and not math.isnan(result) else 0
-        except Exception:
-            return 0
-    return func
+    # Validated up front so overly complex expressions are rejected before rendering
+    return Expression(expr, safe_names)
 
 # Predefined function options
 function_options = {
@@ -103,6 +101,7 @@ with st.sidebar:
     jitter = st.slider("Jitter", 0.0, 1.0, 0.0)
     mirror = st.checkbox("Mirror Effect", False)
     rotate = st.slider("Rotation (degrees)", 0, 360, 0)
+    projection = st.selectbox("Projection", PROJECTION_OPTIONS)
     
     # Advanced settings
     st.header("Advanced Settings")
@@ -126,8 +125,9 @@ def generate_art():
     f2 = safe_function(f2_expr)
     
     x_values = np.linspace(bounds[0], bounds[1], point_count)
-    y_values = [f1(x) for x in x_values]
-    z_values = [f2(x) for x in x_values]
+    # Evaluate in a worker with time and memory budgets
+    y_values, z_values = run_with_budget(evaluate_points, f1, f2, x_values.tolist(),
+                                         timeout=render_timeout(2 * point_count))
     
     # Apply jitter if requested
     if jitter > 0:
@@ -175,6 +175,17 @@ def generate_art():
         rgba_color = to_rgba(color, alpha)
         colors = [rgba_color] * len(y_values)
     
+    # Apply projection to the coordinates and keep colors aligned with them;
+    # lines keep dropped points as NaN breaks so the gaps are not bridged
+    if projection != "None":
+        line_style = art_style != "Points"
+        y_values, z_values, kept = project(y_values, z_values, projection, keep_gaps=line_style)
+        if not kept.any():
+            raise ValueError(f"No points fall inside the {projection} projection. "
+                             "Try narrower plot bounds or another projection.")
+        if not line_style:
+            colors = np.array(colors)[kept]
+    
     # Plot based on style
     if art_style == "Points":
         ax.scatter(y_values, z_values, s=size, c=colors, alpha=alpha)
@@ -198,6 +209,7 @@ def generate_art():
         ax.axis('off')
         
     ax.set_aspect('equal')
+    frame_projection(ax, projection)
     
     return fig
 
@@ -236,6 +248,7 @@ with col2:
             # Save expressions and settings
             settings = f"Art Style: {art_style}\nf1(x): {f1_expr}\nf2(x): {f2_expr}\n"
             settings += f"Points: {point_count}\nJitter: {jitter}\nMirror: {mirror}\nRotation: {rotate}°"
+            settings += f"\nProjection: {projection}"
             if show_advanced and frame:
                 settings += f"\nFrame: Yes\nFrame Color: {frame_color}\nFrame Width: {frame_width}"
             
@@ -247,6 +260,8 @@ with col2:
                 use_container_width=True
             )
             
+        except ExpressionError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"Error generating art: {str(e)}")
 
@@ -258,7 +273,7 @@ with st.expander("How to use this app"):
     1. **Choose a style**: Points, Lines, or Connected Lines
     2. **Adjust colors**: Pick colors and transparency
     3. **Select mathematical expressions**: Choose from presets or create your own
-    4. **Apply effects**: Add jitter, mirroring or rotation
+    4. **Apply effects**: Add jitter, mirroring, rotation or a map projection
     5. **Generate and download**: Create your artwork and save it as PNG or SVG
     
     ### Function options:
@@ -0,0 +1,147 @@
+import numpy as np
+
+# Vectorized map projections for generated point clouds.
+#
+# Matplotlib's polar and geographic axes transform every point through a
+# non-affine pipeline and clip against a curved boundary on each draw, which
+# is far slower than a plain Cartesian scatter. These helpers apply the same
+# projections to the coordinate arrays up front so the result can be drawn on
+# an ordinary axis. The horizontal coordinate is treated as theta/longitude
+# and the vertical one as r/latitude, matching matplotlib's conventions.
+
+HALF_PI = np.pi / 2
+SQRT2 = np.sqrt(2.0)
+
+GEO_PROJECTIONS = ["aitoff", "hammer", "lambert", "mollweide"]
+
+# Aitoff and Hammer only cover the longitude/latitude domain, so points
+# outside it are dropped before projecting. Lambert and Mollweide map any
+# input, and matplotlib clips the result against their elliptical boundary.
+DOMAIN_PROJECTIONS = ["aitoff", "hammer"]
+BOUNDARY_PROJECTIONS = ["lambert", "mollweide"]
+PROJECTION_OPTIONS = ["None", "rectilinear", "polar"] + GEO_PROJECTIONS
+
+# Full extent (xmax, ymax) of each geographic projection, used to frame the
+# projected points the way the matching matplotlib axis would.
+PROJECTION_EXTENTS = {
+    "aitoff": (np.pi, HALF_PI),
+    "hammer": (2 * SQRT2, SQRT2),
+    "lambert": (2.0, 2.0),
+    "mollweide": (2 * SQRT2, SQRT2),
+}
+
+
+def _polar(theta, r):
+    # Polar axes place the smallest negative radius at the origin
+    r_min = r.min() if r.size else 0.0
+    if r_min < 0:
+        r = r - r_min
+    return r * np.cos(theta), r * np.sin(theta)
+
+
+def _aitoff(lon, lat):
+    cos_lat = np.cos(lat)
+    half_lon = lon / 2
+    alpha = np.arccos(np.clip(cos_lat * np.cos(half_lon), -1.0, 1.0))
+    # np.sinc is sin(pi*t)/(pi*t) and is 1 at t=0, which avoids 0/0 at alpha=0
+    sinc_alpha = np.sinc(alpha / np.pi)
+    return 2 * cos_lat * np.sin(half_lon) / sinc_alpha, np.sin(lat) / sinc_alpha
+
+
+def _hammer(lon, lat):
+    cos_lat = np.cos(lat)
+    half_lon = lon / 2
+    alpha = np.sqrt(1 + cos_lat * np.cos(half_lon))
+    return 2 * SQRT2 * cos_lat * np.sin(half_lon) / alpha, SQRT2 * np.sin(lat) / alpha
+
+
+def _lambert(lon, lat):
+    cos_lat = np.cos(lat)
+    # Clamp the antipode, where the projection is undefined; the huge result
+    # falls outside the boundary and is dropped like matplotlib clips it
+    k = np.sqrt(2 / np.maximum(1 + cos_lat * np.cos(lon), 1e-15))
+    return k * cos_lat * np.sin(lon), k * np.sin(lat)
+
+
+def _mollweide(lon, lat, max_iter=50):
+    # Solve 2*aux + sin(2*aux) = pi*sin(lat) with Newton's method on all points
+    # at once; near the poles the iteration is slow, so use the series instead.
+    aux = np.empty_like(lat)
+    near_pole = (HALF_PI - np.abs(lat)) < 0.087
+    rest = ~near_pole
+
+    if rest.any():
+        pi_sin_lat = np.pi * np.sin(lat[rest])
+        theta = 2.0 * lat[rest]
+        for _ in range(max_iter):
+            delta = -(theta + np.sin(theta) - pi_sin_lat) / (1 + np.cos(theta))
+            theta += delta
+            if np.all(np.abs(delta) <= 1e-3):
+                break
+        aux[rest] = theta / 2
+
+    if near_pole.any():
+        e = HALF_PI - np.abs(lat[near_pole])
+        d = 0.5 * (3 * np.pi * e ** 2) ** (1.0 / 3)
+        aux[near_pole] = (HALF_PI - d) * np.sign(lat[near_pole])
+
+    return 2 * SQRT2 / np.pi * lon * np.cos(aux), SQRT2 * np.sin(aux)
+
+
+_PROJECTION_FUNCTIONS = {
+    "polar": _polar,
+    "aitoff": _aitoff,
+    "hammer": _hammer,
+    "lambert": _lambert,
+    "mollweide": _mollweide,
+}
+
+
+def project(x, y, projection, keep_gaps=False):
+    """Project coordinate arrays and return ``(px, py, mask)``.
+
+    ``mask`` marks which of the input points were kept, so per-point data such
+    as colors can be filtered to match. Geographic projections drop the points
+    matplotlib's axis would clip away: Aitoff and Hammer those outside the
+    longitude/latitude domain, Lambert and Mollweide those that project
+    outside the map boundary.
+    Complex values are reduced to their real part. With ``keep_gaps`` the
+    dropped points are returned as NaN instead, so lines break at the gaps
+    rather than joining the surviving points.
+    """
+    x = np.real(np.asarray(x)).astype(float)
+    y = np.real(np.asarray(y)).astype(float)
+    projection = (projection or "None").lower()
+
+    mask = np.isfinite(x) & np.isfinite(y)
+    if projection in DOMAIN_PROJECTIONS:
+        mask &= (np.abs(x) <= np.pi) & (np.abs(y) <= HALF_PI)
+
+    px, py = x[mask], y[mask]
+    func = _PROJECTION_FUNCTIONS.get(projection)
+    if func is not None:
+        px, py = func(px, py)
+
+    if projection in BOUNDARY_PROJECTIONS:
+        xmax, ymax = PROJECTION_EXTENTS[projection]
+        inside = (px / xmax) ** 2 + (py / ymax) ** 2 <= 1
+        mask[np.flatnonzero(mask)[~inside]] = False
+        px, py = px[inside], py[inside]
+
+    if keep_gaps:
+        x = np.full(mask.shape, np.nan)
+        y = np.full(mask.shape, np.nan)
+        x[mask], y[mask] = px, py
+        return x, y, mask
+    return px, py, mask
+
+
+def frame_projection(ax, projection):
+    """Set limits and aspect on a Cartesian axis to match the projection."""
+    projection = (projection or "None").lower()
+    if projection in PROJECTION_EXTENTS:
+        xmax, ymax = PROJECTION_EXTENTS[projection]
+        ax.set_xlim(-xmax, xmax)
+        ax.set_ylim(-ymax, ymax)
+    if projection == "polar" or projection in PROJECTION_EXTENTS:
+        ax.set_aspect('equal')
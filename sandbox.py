@@ -0,0 +1,267 @@
+import ast
+import os
+import pickle
+import signal
+import subprocess
+import sys
+import warnings
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Budgeted evaluation of user supplied expressions.
+#
+# Expressions are checked against an AST whitelist and size limits before
+# they are compiled, and renders run in a separate worker process that is
+# killed once it exceeds its wall-clock budget or runs out of its memory
+# budget, so a single pathological expression cannot stall the shared process.
+
+MAX_NODES = 200
+MAX_DEPTH = 25
+MAX_EXPONENT = 100
+DEFAULT_TIMEOUT = 10.0  # seconds per render, before per-point time
+# A samila generate() of sin(x)*cos(y) over its 395,641 point grid took about
+# 3.1 s on an idle core (~8 microseconds per point); allow 3x for a loaded server
+SECONDS_PER_POINT = 25e-6
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024  # bytes on top of the worker's start size
+# The memory cap relies on RLIMIT_AS and /proc, so it is only enforced on Linux
+MEMORY_LIMIT_SUPPORTED = resource is not None and os.path.exists("/proc/self/statm")
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load,
+    ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv,
+    ast.Mod, ast.Pow, ast.UAdd, ast.USub, ast.IfExp, ast.Compare,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_MEMORY_MESSAGE = "Rendering was stopped because it used too much memory. Try a simpler expression."
+
+
+class ExpressionError(Exception):
+    """Raised when an expression is invalid or too complex to evaluate."""
+
+
+class BudgetExceededError(ExpressionError):
+    """Raised when a render exceeds its time or memory budget."""
+
+
+class MemoryBudgetExceeded(BaseException):
+    """Raised in place of ``MemoryError`` so per-point ``except Exception``
+    handlers cannot swallow it."""
+
+
+def guard_memory(func):
+    """Wrap ``func`` so running out of memory stops the whole render."""
+    def guarded(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except MemoryError:
+            raise MemoryBudgetExceeded()
+    return guarded
+
+
+def _depth(node):
+    children = list(ast.iter_child_nodes(node))
+    return 1 + max((_depth(child) for child in children), default=0)
+
+
+def _has_variables(node):
+    # Whether a subtree reads any name other than a called function. Variables
+    # (x, y, pi, e) are floats, so only variable-free subtrees can build the
+    # unbounded integers that make powers slow.
+    if isinstance(node, ast.Name):
+        return True
+    if isinstance(node, ast.Call):
+        return any(_has_variables(arg) for arg in node.args)
+    return any(_has_variables(child) for child in ast.iter_child_nodes(node))
+
+
+def _constant_exponent(node):
+    # Magnitude of a (signed) numeric constant, or None for anything computed
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        node = node.operand
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, complex)) \
+            and not isinstance(node.value, bool):
+        return abs(node.value)
+    return None
+
+
+def _degree(node):
+    # Rough growth order of a variable-free subtree, so power chains such as
+    # (10**99)**99 or abs(10**99)**99 are bounded by the product of their exponents
+    if isinstance(node, ast.BinOp):
+        if isinstance(node.op, ast.Pow):
+            exponent = _constant_exponent(node.right)
+            return _degree(node.left) * (exponent if exponent is not None else MAX_EXPONENT + 1)
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            return max(_degree(node.left), _degree(node.right))
+        return _degree(node.left) + _degree(node.right)
+    if isinstance(node, ast.UnaryOp):
+        return _degree(node.operand)
+    if isinstance(node, ast.Call):
+        return max((_degree(arg) for arg in node.args), default=1)
+    if isinstance(node, ast.IfExp):
+        return max(_degree(node.body), _degree(node.orelse))
+    return 1
+
+
+def compile_expression(expr, names):
+    """Validate ``expr`` and compile it for ``eval``.
+
+    Only arithmetic, comparisons, numeric constants, the given ``names`` and
+    calls to the callables among them are allowed. Raises ``ExpressionError``
+    otherwise.
+    """
+    if len(expr) > MAX_NODES * 10:
+        raise ExpressionError("Expression is too long.")
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except (SyntaxError, ValueError) as e:
+        raise ExpressionError(f"Invalid expression: {e}")
+
+    nodes = list(ast.walk(tree))
+    if len(nodes) > MAX_NODES:
+        raise ExpressionError(f"Expression is too complex (more than {MAX_NODES} elements).")
+    if _depth(tree) > MAX_DEPTH:
+        raise ExpressionError(f"Expression is nested too deeply (more than {MAX_DEPTH} levels).")
+
+    for node in nodes:
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ExpressionError(f"'{type(node).__name__}' is not allowed in expressions.")
+        if isinstance(node, ast.Name) and node.id not in names:
+            raise ExpressionError(f"Unknown name '{node.id}'.")
+        if isinstance(node, ast.Constant) and (
+                isinstance(node.value, bool) or not isinstance(node.value, (int, float, complex))):
+            raise ExpressionError("Only numeric constants are allowed.")
+        if isinstance(node, ast.Call):
+            if (not isinstance(node.func, ast.Name) or not callable(names.get(node.func.id))
+                    or node.keywords):
+                raise ExpressionError("Only plain calls to the listed functions are allowed.")
+        # Float powers overflow quickly, so only integer powers are limited
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow) \
+                and not _has_variables(node.left) and not _has_variables(node.right):
+            exponent = _constant_exponent(node.right)
+            if exponent is None:
+                raise ExpressionError("Exponents of plain numbers must be plain numbers.")
+            if exponent * _degree(node.left) > MAX_EXPONENT:
+                raise ExpressionError(f"Exponents larger than {MAX_EXPONENT} are not allowed.")
+
+    return compile(tree, "<expression>", "eval")
+
+
+class Expression:
+    """A validated expression of ``x`` and ``y`` that can be called like a
+    function and pickled into a worker process."""
+
+    def __init__(self, expr, names):
+        self.expr = expr
+        self.names = names
+        self._code = compile_expression(expr, names)
+
+    def __getstate__(self):
+        # Code objects cannot be pickled, so the worker recompiles the text
+        return {"expr": self.expr, "names": self.names}
+
+    def __setstate__(self, state):
+        self.__init__(state["expr"], state["names"])
+
+    def __call__(self, x, y=None):
+        return eval(self._code, {"__builtins__": {}}, dict(self.names, x=x, y=y))
+
+
+def render_timeout(points):
+    """Wall-clock budget in seconds for a render evaluating ``points`` points."""
+    return DEFAULT_TIMEOUT + points * SECONDS_PER_POINT
+
+
+def _address_space():
+    # Current virtual memory size in bytes, or None where it cannot be read
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _limit_memory(memory_limit):
+    current = _address_space()
+    if current is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = current + memory_limit
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _run(func, args, memory_limit):
+    try:
+        if memory_limit and MEMORY_LIMIT_SUPPORTED:
+            _limit_memory(memory_limit)
+        return "ok", func(*args)
+    except (MemoryError, MemoryBudgetExceeded):
+        return "memory", None
+    except Exception as e:
+        return "error", str(e)
+
+
+def _worker_main():
+    # Entry point of the worker interpreter. The request arrives pickled on
+    # stdin and the result leaves pickled on the original stdout, which is
+    # moved aside so stray prints from the render cannot corrupt it.
+    output = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.path[:0] = pickle.load(sys.stdin.buffer)
+    func, args, memory_limit = pickle.load(sys.stdin.buffer)
+    pickle.dump(_run(func, args, memory_limit), output)
+    output.close()
+
+
+def run_with_budget(func, *args, timeout=DEFAULT_TIMEOUT, memory_limit=DEFAULT_MEMORY_LIMIT):
+    """Run ``func(*args)`` in a killable worker process and return its result.
+
+    ``func`` must be a module-level function and ``args`` picklable, such as
+    ``Expression`` objects. Raises ``BudgetExceededError`` if the worker runs
+    longer than ``timeout`` seconds or allocates more than ``memory_limit``
+    bytes, and ``ExpressionError`` if it fails for any other reason.
+    """
+    if memory_limit and not MEMORY_LIMIT_SUPPORTED:
+        warnings.warn("The render memory limit is only enforced on Linux.", RuntimeWarning)
+
+    # The worker is a fresh interpreter rather than a fork of the threaded
+    # Streamlit server, and unlike multiprocessing's spawn and forkserver it
+    # does not re-run the app script, which Streamlit installs as __main__
+    request = pickle.dumps(sys.path) + pickle.dumps((func, args, memory_limit))
+    command = [sys.executable, "-c",
+               f"import sys; sys.path.insert(0, {_HERE!r}); import sandbox; sandbox._worker_main()"]
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+    except OSError as e:
+        raise ExpressionError(f"Could not start the render worker: {e}")
+
+    try:
+        output, _ = process.communicate(request, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        raise BudgetExceededError(
+            f"Rendering took longer than {timeout:g} seconds. Try a simpler expression.")
+
+    try:
+        status, result = pickle.loads(output)
+    except Exception:
+        # SIGKILL that we did not send is the kernel's out-of-memory killer
+        if process.returncode == -getattr(signal, "SIGKILL", 9):
+            raise BudgetExceededError(_MEMORY_MESSAGE)
+        raise ExpressionError(
+            f"The render worker exited unexpectedly (exit code {process.returncode}).")
+
+    if status == "memory":
+        raise BudgetExceededError(_MEMORY_MESSAGE)
+    if status == "error":
+        raise ExpressionError(f"Error while evaluating expression: {result}")
+    return result
@@ -0,0 +1,39 @@
+import math
+
+from sandbox import guard_memory
+
+# Render targets run by sandbox.run_with_budget.
+#
+# Each render runs in a fresh interpreter, so the targets have to live in an
+# importable module and receive only picklable arguments, such as
+# sandbox.Expression objects, rather than closures from the app scripts.
+
+
+def evaluate_points(f1, f2, x_values):
+    """Evaluate ``f1`` and ``f2`` at each x; failing or NaN points give 0."""
+    def evaluate(func, x):
+        try:
+            result = func(x)
+            return result if isinstance(result, (int, float, complex)) and not math.isnan(result) else 0
+        except MemoryError:
+            # Let the sandbox report the memory budget instead of returning 0
+            raise
+        except Exception:
+            return 0
+    return [evaluate(f1, x) for x in x_values], [evaluate(f2, x) for x in x_values]
+
+
+def generate_points(f1, f2, seed, sampling):
+    """Generate samila data for ``f1`` and ``f2`` and return ``(data1, data2, seed)``."""
+    # Imported here so workers that do not need samila start without matplotlib
+    from samila import GenerativeImage
+
+    # Samila skips points that raise, so guard against it swallowing MemoryError
+    g = GenerativeImage(guard_memory(f1), guard_memory(f2))
+    g.generate(seed=seed)
+
+    # Apply filters according to settings
+    if sampling:
+        g.generate(sampling)
+
+    return g.data1, g.data2, g.seed